@@ -0,0 +1,367 @@
+from flask import *
+from flask import Response
+from datetime import datetime
+from decimal import Decimal
+import logging
+import os
+from utils.reserve_logic import calculate_reserves
+from utils.reserve_engine import METHODS
+from utils.ingest import REQUIRED_COLUMNS, normalize_columns, read_upload_frame, ingest_inventory
+from utils.jobs import get_job_manager
+from utils.tasks import calculate_reserves_job, ingest_file_job
+from utils.reserve_queries import fetch_reserve_date_groups, fetch_reserves_page
+from utils.reserve_export import export_filters, write_reserves_xlsx, iter_reserves_csv, iter_file_chunks
+from utils.inventory_queries import fetch_upload_groups, fetch_inventory_page, fetch_categories, parse_page_size
+from db_connect import db_session, pool_metrics
+from utils.log_config import setup_logging
+from utils import profiling
+import tempfile
+from io import BytesIO
+
+app = Flask(__name__)
+app.secret_key = 'your_secret_key'
+
+# Сколько ошибок загрузки показывать пользователю в одном сообщении
+MAX_UPLOAD_ERRORS_SHOWN = 10
+
+# Файлы больше этого размера (байт) загружаются в фоновой задаче
+UPLOAD_ASYNC_THRESHOLD = int(os.environ.get('UPLOAD_ASYNC_THRESHOLD', 1024 * 1024))
+
+# Настройка логирования
+setup_logging()
+
+# Замеры времени запросов (PROFILING=1): заголовок Server-Timing и /metrics
+profiling.init_app(app)
+
+# Фильтр для форматирования дат
+app.jinja_env.filters['russian_date'] = lambda x: datetime.strptime(x, '%Y-%m-%d').strftime('%d.%m.%Y')
+
+
+@app.route('/')
+def index():
+    return render_template('index.html')
+
+@app.route('/upload', methods=['GET', 'POST'])
+def upload_excel():
+    if request.method == 'POST':
+        try:
+            file = request.files['file']
+            if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
+                flash('Ошибка: файл должен быть в формате .xlsx, .xls или .csv', 'danger')
+                return redirect('/upload')
+
+            content = file.read()
+            if len(content) > UPLOAD_ASYNC_THRESHOLD:
+                # Большие файлы разбираются и загружаются в фоновой задаче
+                job = get_job_manager().submit('upload', ingest_file_job, file.filename, content,
+                                               description=file.filename)
+                flash(f'Файл {file.filename} загружается в фоне, задача {job.id}. '
+                      f'Статус: {url_for("job_status", job_id=job.id)}', 'info')
+                return redirect('/')
+
+            df = normalize_columns(read_upload_frame(file.filename, BytesIO(content)))
+
+            if not all(col in df.columns for col in REQUIRED_COLUMNS):
+                flash('Ошибка: файл должен содержать столбцы: name, quantity, price', 'danger')
+                return redirect('/upload')
+
+            with db_session() as conn:
+                inserted, row_errors = ingest_inventory(conn, df)
+
+            flash(f'Данные успешно загружены: {inserted} из {len(df)} строк', 'success')
+            if row_errors:
+                details = '; '.join(f'строка {row}: {message}' for row, message in row_errors[:MAX_UPLOAD_ERRORS_SHOWN])
+                if len(row_errors) > MAX_UPLOAD_ERRORS_SHOWN:
+                    details += f' и ещё {len(row_errors) - MAX_UPLOAD_ERRORS_SHOWN}'
+                flash(f'Пропущены строки с ошибками: {details}', 'warning')
+                logging.warning("Загрузка файла %s: пропущено строк с ошибками %d", file.filename,
+                                len({row for row, _ in row_errors}))
+        except Exception as e:
+            flash(f'Ошибка при загрузке файла: {str(e)}', 'danger')
+            logging.error("Ошибка при загрузке файла: %s", e)
+        return redirect('/')
+    return render_template('upload.html')
+
+
+def inventory_page_args():
+    """Фильтры и параметры страницы МПЗ из строки запроса."""
+    filters = {
+        'upload_time': request.args.get('upload_time') or None,
+        'category': request.args.get('category') or None,
+    }
+    return filters, request.args.get('after', type=int), parse_page_size(request.args.get('limit'))
+
+
+def json_row(row):
+    """Строка БД в JSON-совместимый словарь."""
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else
+            float(value) if isinstance(value, Decimal) else value
+            for key, value in dict(row).items()}
+
+
+@app.route('/inventory')
+def show_inventory():
+    filters, after_id, limit = inventory_page_args()
+    try:
+        with db_session() as conn:
+            groups = fetch_upload_groups(conn, category=filters['category'])
+            rows, next_after = fetch_inventory_page(conn, after_id=after_id, limit=limit, **filters)
+            categories = fetch_categories(conn)
+
+        # Позиции текущей страницы по документам; счётчики групп — из GROUP BY
+        page_items = {}
+        for row in rows:
+            key = row['upload_timestamp'].strftime("%Y-%m-%d %H:%M:%S") if row['upload_timestamp'] else "Без даты"
+            page_items.setdefault(key, []).append(row)
+
+        return render_template('inventory.html', groups=groups, page_items=page_items, categories=categories,
+                               filters=filters, after=after_id, next_after=next_after, limit=limit)
+    except Exception as e:
+        logging.error("Ошибка в маршруте /inventory: %s", e)
+        flash(f'Ошибка при загрузке списка МПЗ: {str(e)}', 'danger')
+        return render_template('inventory.html', groups=[], page_items={}, categories=[],
+                               filters=filters, after=None, next_after=None, limit=limit)
+
+
+@app.route('/api/inventory')
+def api_inventory():
+    filters, after_id, limit = inventory_page_args()
+    try:
+        with db_session() as conn:
+            groups = fetch_upload_groups(conn, category=filters['category'])
+            rows, next_after = fetch_inventory_page(conn, after_id=after_id, limit=limit, **filters)
+        return jsonify({
+            'groups': [{'upload_time': upload_time, 'count': count} for upload_time, count in groups],
+            'items': [json_row(row) for row in rows],
+            'next_after': next_after,
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error("Ошибка в маршруте /api/inventory: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/calculate', methods=['POST'])
+def calculate_reserve_route():
+    method = request.form.get('method')
+    upload_time_str = request.form.get('upload_time')
+    incremental = request.form.get('incremental') == 'on'
+    if method not in METHODS:
+        # method_used входит в ключ ON CONFLICT, а NULL в уникальном индексе не конфликтует
+        flash('Не выбран или неизвестен метод расчёта резервов', 'danger')
+        return redirect(url_for('show_inventory'))
+    logging.info("Запуск расчёта резервов: метод %s, документ %s", method, upload_time_str)
+
+    try:
+        if upload_time_str == "all":
+            # Расчёт по всем документам выполняется в фоновой задаче порциями
+            job = get_job_manager().submit('calculate', calculate_reserves_job, method,
+                                           incremental=incremental, description=f'{method}: все документы')
+            flash(f'Расчёт резервов методом "{method}" по всем документам запущен в фоне, задача {job.id}. '
+                  f'Статус: {url_for("job_status", job_id=job.id)}', 'info')
+            return redirect(url_for('show_inventory'))
+
+        with db_session() as conn:
+            # Документ — все позиции, загруженные в ту же секунду
+            stats = calculate_reserves(conn, override_method=method, upload_time=upload_time_str,
+                                       incremental=incremental)
+
+        message = f'Расчёт резервов выполнен методом "{method}" для документа "{upload_time_str}".'
+        if incremental:
+            message += f' Пересчитано позиций: {stats["calculated"]}, без изменений: {stats["skipped"]}.'
+        flash(message, 'success')
+
+    except Exception as e:
+        flash(f'Ошибка при расчёте резервов: {str(e)}', 'danger')
+
+    return redirect(url_for('show_inventory'))
+
+
+def reserves_page_args():
+    """Фильтры и ключ страницы резервов из строки запроса."""
+    filters = {
+        'upload_time': request.args.get('upload_time') or None,
+        'category': request.args.get('category') or None,
+        'calculation_date': request.args.get('calculation_date') or None,
+    }
+    after = None
+    if request.args.get('after_date') and request.args.get('after_id'):
+        after = (request.args['after_date'], request.args.get('after_name', ''), request.args.get('after_id', type=int))
+    return filters, after, parse_page_size(request.args.get('limit'))
+
+
+def next_page_args(next_after, filters):
+    """Параметры запроса следующей страницы резервов (вместе с фильтрами)."""
+    if next_after is None:
+        return None
+    after_date, after_name, after_id = next_after
+    return dict(filters, after_date=after_date, after_name=after_name, after_id=after_id)
+
+
+@app.route('/reserves')
+def show_reserves():
+    filters, after, limit = reserves_page_args()
+    try:
+        with db_session() as conn:
+            groups = fetch_reserve_date_groups(conn, **filters)
+            reserves, next_after = fetch_reserves_page(conn, after=after, limit=limit, **filters)
+
+        # Преобразуем в список словарей для шаблона
+        reserve_list = [
+            {
+                'item_id': row['item_id'],
+                'name': row['name'],
+                'calculated_reserve': row['calculated_reserve'],
+                'method_used': row['method_used'],
+                'calculation_date': row['calculation_date'].strftime('%Y-%m-%d') if row['calculation_date'] else '—'
+            }
+            for row in reserves
+        ]
+
+        page_reserves = {}
+        for r in reserve_list:
+            page_reserves.setdefault(r['calculation_date'], []).append(r)
+
+        return render_template('reserve.html', groups=groups, page_reserves=page_reserves,
+                               total=sum(count for _, count in groups), filters=filters,
+                               after=after, next_page=next_page_args(next_after, filters), limit=limit)
+
+    except Exception as e:
+        logging.error("Ошибка в маршруте /reserves: %s", e)
+        flash(f'Ошибка при загрузке резервов: {str(e)}', 'danger')
+        return render_template('reserve.html', groups=[], page_reserves={}, total=0, filters=filters,
+                               after=None, next_page=None, limit=limit)
+
+
+@app.route('/api/reserves')
+def api_reserves():
+    filters, after, limit = reserves_page_args()
+    try:
+        with db_session() as conn:
+            groups = fetch_reserve_date_groups(conn, **filters)
+            reserves, next_after = fetch_reserves_page(conn, after=after, limit=limit, **filters)
+        return jsonify({
+            'groups': [{'calculation_date': date_str, 'count': count} for date_str, count in groups],
+            'reserves': [json_row(row) for row in reserves],
+            'next_page': next_page_args(next_after, filters),
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error("Ошибка в маршруте /api/reserves: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/export_reserves_excel')
+def export_reserves_excel():
+    try:
+        filters = export_filters(request.args.get('date_from') or None,
+                                 request.args.get('date_to') or None,
+                                 request.args.get('method') or None)
+    except ValueError:
+        return Response("Неверный формат даты. Ожидается YYYY-MM-DD", status=400)
+
+    if request.args.get('format') == 'csv':
+        def generate():
+            try:
+                with db_session() as conn:
+                    yield from iter_reserves_csv(conn, filters)
+            except Exception as e:
+                logging.error("Ошибка при экспорте резервов в CSV: %s", e)
+                raise
+
+        return Response(
+            stream_with_context(generate()),
+            mimetype='text/csv',
+            headers={'Content-Disposition': 'attachment; filename=reserves_export.csv'}
+        )
+
+    # xlsx собирается во временном файле и отдаётся порциями
+    output = tempfile.TemporaryFile()
+    try:
+        with db_session() as conn:
+            write_reserves_xlsx(conn, filters, output)
+        output.seek(0)
+
+        return Response(
+            iter_file_chunks(output),
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            headers={'Content-Disposition': 'attachment; filename=reserves_export.xlsx'}
+        )
+
+    except Exception as e:
+        output.close()
+        logging.error("Ошибка при экспорте резервов в Excel: %s", e)
+        return Response(f"Ошибка при экспорте: {e}", status=500)
+
+from datetime import datetime, timedelta
+
+@app.route('/delete_by_upload_time', methods=['POST'])
+def delete_by_upload_time():
+    data = request.get_json()
+    if not data or 'upload_time' not in data:
+        return jsonify({'error': 'upload_time не указан'}), 400
+
+    upload_time_str = data['upload_time']
+
+    try:
+        upload_time = datetime.strptime(upload_time_str, "%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return jsonify({'error': 'Неверный формат upload_time. Ожидается YYYY-MM-DD HH:MM:SS'}), 400
+
+    start_time = upload_time
+    end_time = upload_time + timedelta(seconds=1)
+
+    try:
+        with db_session() as conn:
+            cur = conn.cursor()
+            cur.execute('DELETE FROM inventory_items WHERE upload_timestamp >= %s AND upload_timestamp < %s', (start_time, end_time))
+            deleted_count = cur.rowcount
+            cur.close()
+            conn.commit()
+        return jsonify({'message': f'Удалено записей: {deleted_count} для даты загрузки {upload_time_str}'}), 200
+    except Exception as e:
+        logging.error("Ошибка при удалении по upload_time=%s: %s", upload_time_str, e)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/metrics/db')
+def db_pool_metrics():
+    return jsonify(pool_metrics())
+
+
+@app.route('/metrics')
+def metrics():
+    jobs = {}
+    for job in get_job_manager().list():
+        jobs[job.status] = jobs.get(job.status, 0) + 1
+    return jsonify({
+        'profiling': profiling.PROFILING_ENABLED,
+        'routes': profiling.route_stats.snapshot(),
+        'db_pool': pool_metrics(),
+        'jobs': jobs,
+    })
+
+
+@app.route('/jobs')
+def list_jobs():
+    return jsonify([job.to_dict() for job in get_job_manager().list()])
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({'error': 'Задача не найдена'}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if not get_job_manager().cancel(job_id):
+        return jsonify({'error': 'Задача не найдена или уже завершена'}), 404
+    return jsonify(get_job_manager().get(job_id).to_dict())
+
+
+if __name__ == '__main__':
+    app.run(debug=True)
@@ -0,0 +1,237 @@
+"""Бенчмарк расчёта, загрузки и выгрузки резервов на синтетических данных.
+
+Запуск из корня проекта:
+
+    python -m benchmarks.bench_reserves --sizes 10000 100000 1000000
+    python -m benchmarks.bench_reserves --postgres --sizes 10000 100000
+
+Без --postgres БД заменяется данными в памяти: замеряется только работа на
+стороне Python (DataFrame, расчёт, подготовка COPY и строк upsert, сборка xlsx). С --postgres
+этапы выполняются на локальной БД (настройки из db_connect) во временных
+таблицах, которые перекрывают рабочие и удаляются при отключении.
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from datetime import datetime
+from io import BytesIO, StringIO
+
+import numpy as np
+import pandas as pd
+
+from utils.reserve_engine import items_to_frame, calculate_reserves_frame, input_fingerprints
+from utils.reserve_logic import calculate_reserve, calculate_reserves
+from utils.ingest import prepare_inventory_frame, ingest_inventory
+from utils.reserve_export import export_filters, write_reserves_xlsx, iter_reserves_csv
+from utils.reserve_queries import upsert_reserves
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+ITEM_COLUMNS = ['id', 'name', 'category', 'quantity', 'price', 'shelf_life_months',
+                'received_date', 'usage_probability', 'market_price', 'upload_timestamp']
+
+
+def generate_upload_frame(n, seed=0):
+    """Синтетическая таблица МПЗ в виде загружаемого файла."""
+    rng = np.random.default_rng(seed)
+    price = rng.uniform(1, 5000, n).round(2)
+    market_price = (price * rng.uniform(0.3, 1.5, n)).round(2)
+    market_price[rng.random(n) < 0.3] = np.nan
+    received = pd.Timestamp(datetime.today().date()) - pd.to_timedelta(rng.integers(-30, 2000, n), unit='D')
+    return pd.DataFrame({
+        'name': [f'МПЗ {i}' for i in range(n)],
+        'category': rng.choice(['Сырьё', 'Материалы', 'Запчасти', 'Упаковка'], n),
+        'quantity': rng.integers(0, 1000, n),
+        'price': price,
+        'shelf_life_months': rng.choice([0, 6, 12, 24, 36], n),
+        'received_date': received,
+        'usage_probability': rng.choice([0, 25, 50, 75, 100], n).astype(float),
+        'market_price': market_price,
+    })
+
+
+def upload_frame_to_rows(upload_df, upload_time):
+    """Строки inventory_items в том виде, в каком их возвращает psycopg2."""
+    df = upload_df.copy()
+    df.insert(0, 'id', np.arange(1, len(df) + 1))
+    df['received_date'] = df['received_date'].dt.date
+    df['market_price'] = df['market_price'].astype(object).where(df['market_price'].notna(), None)
+    df['upload_timestamp'] = upload_time
+    return list(df[ITEM_COLUMNS].itertuples(index=False, name=None))
+
+
+class MemoryExportConnection:
+    """Заменитель соединения для выгрузки: отдаёт готовые строки истории резервов."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, name=None):
+        return _MemoryCursor(self.rows, aggregate=name is None)
+
+
+class _MemoryCursor:
+    def __init__(self, rows, aggregate):
+        self.rows, self.aggregate, self.pos = rows, aggregate, 0
+
+    def execute(self, sql, params=None):
+        pass
+
+    def fetchmany(self, size):
+        chunk = self.rows[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def fetchall(self):
+        # Ответ агрегирующего запроса ширин столбцов
+        df = pd.DataFrame(self.rows, columns=['calculation_date', 'name', 'method_used', 'calculated_reserve'])
+        grouped = df.groupby('calculation_date')
+        return [
+            (date, len(group), group['name'].str.len().max(), group['method_used'].str.len().max(),
+             group['calculated_reserve'].astype(str).str.len().max())
+            for date, group in grouped
+        ]
+
+    def close(self):
+        pass
+
+
+class Bench:
+    """Замер времени и пикового потребления памяти этапов."""
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def run(self, stage, items, fn, *args, **kwargs):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        peak = None
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+        self.results.append({
+            'stage': stage,
+            'items': items,
+            'seconds': round(elapsed, 4),
+            'items_per_s': round(items / elapsed) if elapsed > 0 else None,
+            'peak_mb': round(peak, 1) if peak is not None else None,
+        })
+        return result
+
+    def report(self):
+        print(f"{'этап':<32}{'позиций':>10}{'сек':>10}{'позиций/с':>14}{'пик, МБ':>10}")
+        for r in self.results:
+            peak = '' if r['peak_mb'] is None else r['peak_mb']
+            print(f"{r['stage']:<32}{r['items']:>10}{r['seconds']:>10}{r['items_per_s'] or '':>14}{peak:>10}")
+
+
+def bench_memory(bench, n, method, reference_limit):
+    """Этапы без БД."""
+    upload_time = datetime.now()
+    upload_df = generate_upload_frame(n)
+    rows = upload_frame_to_rows(upload_df, upload_time)
+
+    def prepare_copy():
+        prepared, _ = prepare_inventory_frame(upload_df.copy(), upload_time)
+        buffer = StringIO()
+        prepared.to_csv(buffer, header=False, index=False, na_rep='', date_format='%Y-%m-%d %H:%M:%S.%f')
+        return buffer
+
+    bench.run('upload: подготовка COPY', n, prepare_copy)
+    df = bench.run('fetch: строки -> DataFrame', n, items_to_frame, rows, ITEM_COLUMNS)
+    reserves = bench.run(f'compute: векторно ({method})', n, calculate_reserves_frame, df, method)
+    bench.run('compute: отпечатки входных данных', n, input_fingerprints, df, method)
+
+    m = min(n, reference_limit)
+    item_dicts = [dict(zip(ITEM_COLUMNS, row)) for row in rows[:m]]
+    bench.run(f'compute: построчно ({method})', m,
+              lambda: [calculate_reserve(item, override_method=method) for item in item_dicts])
+
+    today_str = datetime.today().strftime('%Y-%m-%d')
+    bench.run('insert: сборка кортежей (без БД)', n, lambda: [
+        (int(item_id), float(reserve), method, today_str)
+        for item_id, reserve in zip(df['id'], reserves)
+    ])
+
+    history = [(datetime.today().date(), name, method, float(reserve))
+               for name, reserve in zip(df['name'], reserves)]
+    conn = MemoryExportConnection(history)
+    bench.run('export: xlsx (write-only)', n, write_reserves_xlsx, conn, export_filters(), BytesIO())
+    bench.run('export: csv', n, lambda: sum(len(chunk) for chunk in iter_reserves_csv(conn, export_filters())))
+
+
+def bench_postgres(bench, n, method, reference_limit):
+    """Этапы на локальной PostgreSQL во временных таблицах."""
+    from db_connect import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        # Без DEFAULTS: иначе временные таблицы брали бы id из рабочих последовательностей
+        for table in ('inventory_items', 'reserve_calculations'):
+            cur.execute(f'CREATE TEMP TABLE {table} (LIKE public.{table} INCLUDING ALL EXCLUDING DEFAULTS)')
+            cur.execute(f'ALTER TABLE {table} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY')
+        conn.commit()
+
+        upload_df = generate_upload_frame(n)
+        bench.run('upload: ingest_inventory (COPY)', n, ingest_inventory, conn, upload_df)
+
+        def fetch():
+            cur.execute('SELECT * FROM inventory_items ORDER BY id')
+            return items_to_frame(cur.fetchall(), columns=[col.name for col in cur.description])
+
+        df = bench.run('fetch: SELECT -> DataFrame', n, fetch)
+        reserves = bench.run(f'compute: векторно ({method})', n, calculate_reserves_frame, df, method)
+        fingerprints = input_fingerprints(df, method)
+
+        def insert():
+            today_str = datetime.today().strftime('%Y-%m-%d')
+            upsert_reserves(cur, [(int(item_id), float(reserve), method, today_str, fingerprint)
+                                  for item_id, reserve, fingerprint in zip(df['id'], reserves, fingerprints)])
+            conn.commit()
+
+        bench.run('insert: upsert_reserves', n, insert)
+
+        m = min(n, reference_limit)
+        item_dicts = df.head(m).to_dict('records')
+        bench.run(f'compute: построчно ({method})', m,
+                  lambda: [calculate_reserve(item, override_method=method) for item in item_dicts])
+
+        bench.run('calculate_reserves (целиком)', n, calculate_reserves, conn, method)
+        bench.run('calculate_reserves (инкрем.)', n, calculate_reserves, conn, method, incremental=True)
+        bench.run('export: xlsx (write-only)', n, write_reserves_xlsx, conn, export_filters(), BytesIO())
+        bench.run('export: csv', n, lambda: sum(len(chunk) for chunk in iter_reserves_csv(conn, export_filters())))
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк расчёта, загрузки и выгрузки резервов')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='размеры наборов данных')
+    parser.add_argument('--method', default='standard', help='метод расчёта')
+    parser.add_argument('--postgres', action='store_true', help='замерять на локальной PostgreSQL')
+    parser.add_argument('--reference-limit', type=int, default=50_000,
+                        help='сколько позиций считать построчным calculate_reserve')
+    parser.add_argument('--no-memory', action='store_true', help='не замерять пиковую память (tracemalloc)')
+    parser.add_argument('--json', action='store_true', help='вывести результаты в JSON')
+    args = parser.parse_args()
+
+    bench = Bench(trace_memory=not args.no_memory)
+    for n in args.sizes:
+        if args.postgres:
+            bench_postgres(bench, n, args.method, args.reference_limit)
+        else:
+            bench_memory(bench, n, args.method, args.reference_limit)
+
+    if args.json:
+        print(json.dumps(bench.results, ensure_ascii=False, indent=2))
+    else:
+        bench.report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+import os
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extras import RealDictCursor
+from utils.profiling import PROFILING_ENABLED, TimedConnection
+
+DATABASE = {
+    'dbname': os.environ.get('DB_NAME', 'mpz'),
+    'user': os.environ.get('DB_USER', 'postgres'),
+    'password': os.environ.get('DB_PASSWORD', '1234'),
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'port': int(os.environ.get('DB_PORT', 5432))
+}
+
+# Настройки пула соединений
+POOL_MIN = int(os.environ.get('DB_POOL_MIN', 1))
+POOL_MAX = int(os.environ.get('DB_POOL_MAX', 10))
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 30))
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """Свободное соединение не появилось за DB_POOL_TIMEOUT секунд."""
+
+
+class ConnectionPool:
+    """Пул соединений с ожиданием свободного соединения и метриками.
+
+    ThreadedConnectionPool при исчерпании сразу выбрасывает PoolError,
+    поэтому выдача соединений ограничена семафором на maxconn.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, **params):
+        self._pool = pool.ThreadedConnectionPool(minconn, maxconn, **params)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.checked_out = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def getconn(self):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeoutError(f"Нет свободных соединений с БД за {self.timeout} с")
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        waited = time.perf_counter() - start
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+        return conn
+
+    def putconn(self, conn):
+        try:
+            # Закрытые (оборванные) соединения не возвращаются в пул
+            self._pool.putconn(conn, close=bool(conn.closed))
+        finally:
+            with self._lock:
+                self.checked_out -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                'pool_size': self.maxconn,
+                'pool_min': self._pool.minconn,
+                'connections_open': len(self._pool._pool) + len(self._pool._used),
+                'checked_out': self.checked_out,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_time_total': round(self.wait_time_total, 6),
+                'wait_time_avg': round(self.wait_time_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_time_max': round(self.wait_time_max, 6),
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Общий пул соединений процесса (создаётся при первом обращении)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                params = dict(DATABASE)
+                if PROFILING_ENABLED:
+                    # Курсоры учитывают время обращений к БД для Server-Timing и /metrics
+                    params['connection_factory'] = TimedConnection
+                _pool = ConnectionPool(POOL_MIN, POOL_MAX, POOL_TIMEOUT, **params)
+                atexit.register(_pool.closeall)
+    return _pool
+
+
+@contextmanager
+def db_session():
+    """Соединение из пула на время запроса.
+
+    При ошибке транзакция откатывается, соединение всегда возвращается в пул.
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        db_pool.putconn(conn)
+
+
+def pool_metrics():
+    """Метрики пула: размер, занятые соединения, время ожидания."""
+    if _pool is None:
+        return {'pool_size': POOL_MAX, 'pool_min': POOL_MIN, 'connections_open': 0, 'checked_out': 0}
+    return _pool.metrics()
+
+
+def get_db_connection():
+    """Отдельное подключение к PostgreSQL вне пула (скрипты, миграции)."""
+    conn = psycopg2.connect(**DATABASE)
+    return conn
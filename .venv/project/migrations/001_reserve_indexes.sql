@@ -0,0 +1,8 @@
+-- Последний резерв по позиции и методу:
+-- DISTINCT ON (item_id) ... WHERE method_used = %s ORDER BY item_id, calculation_date DESC
+CREATE INDEX IF NOT EXISTS idx_reserve_calculations_item_method_date
+    ON reserve_calculations (item_id, method_used, calculation_date DESC);
+
+-- Группировка и выборка МПЗ по документу загрузки
+CREATE INDEX IF NOT EXISTS idx_inventory_items_upload_timestamp
+    ON inventory_items (upload_timestamp);
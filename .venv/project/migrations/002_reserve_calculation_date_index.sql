@@ -0,0 +1,3 @@
+-- Постраничный просмотр истории резервов: ORDER BY calculation_date DESC
+CREATE INDEX IF NOT EXISTS idx_reserve_calculations_date
+    ON reserve_calculations (calculation_date DESC);
@@ -0,0 +1,14 @@
+-- Отпечаток входных данных расчёта для инкрементального пересчёта
+ALTER TABLE reserve_calculations ADD COLUMN IF NOT EXISTS input_fingerprint TEXT;
+
+-- Удаляем повторные расчёты за одну дату одним методом, оставляя последний
+DELETE FROM reserve_calculations r
+USING reserve_calculations d
+WHERE r.item_id = d.item_id
+  AND r.calculation_date = d.calculation_date
+  AND r.method_used IS NOT DISTINCT FROM d.method_used
+  AND r.id < d.id;
+
+-- Ключ идемпотентной записи: INSERT ... ON CONFLICT (item_id, calculation_date, method_used)
+CREATE UNIQUE INDEX IF NOT EXISTS uq_reserve_calculations_item_date_method
+    ON reserve_calculations (item_id, calculation_date, method_used);
@@ -0,0 +1,14 @@
+-- Подробный аудит расчёта по позициям (пишется пакетно при RESERVE_AUDIT=1)
+CREATE TABLE IF NOT EXISTS reserve_audit (
+    id BIGSERIAL PRIMARY KEY,
+    item_id INTEGER NOT NULL,
+    prev_reserve NUMERIC,
+    calculated_reserve NUMERIC,
+    delta NUMERIC GENERATED ALWAYS AS (calculated_reserve - prev_reserve) STORED,
+    method_used TEXT,
+    calculation_date DATE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_reserve_audit_item_date
+    ON reserve_audit (item_id, calculation_date DESC);
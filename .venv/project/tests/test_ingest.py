@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pandas as pd
+
+from utils.ingest import convert_received_dates, normalize_columns, prepare_inventory_frame
+
+UPLOAD_TIME = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def test_convert_received_dates_is_day_first():
+    result, invalid = convert_received_dates(["05.03.2024", "13.03.2024", "2024-03-05", "2024-03-05 10:00:00"])
+    assert result.dt.strftime("%Y-%m-%d").tolist() == ["2024-03-05", "2024-03-13", "2024-03-05", "2024-03-05"]
+    assert not invalid.any()
+
+
+def test_convert_received_dates_excel_serials_and_datetimes():
+    result, invalid = convert_received_dates([45000, datetime(2024, 1, 2), None])
+    assert result.iloc[0] == pd.Timestamp(2023, 3, 15)
+    assert result.iloc[1] == pd.Timestamp(2024, 1, 2)
+    assert pd.isna(result.iloc[2])
+    assert invalid.tolist() == [False, False, False]
+
+
+def test_convert_received_dates_reports_unknown_formats():
+    result, invalid = convert_received_dates(["03/05/2024", "не дата", "2024-13-01", "01.01.2024"])
+    assert invalid.tolist() == [True, True, True, False]
+
+
+def test_convert_received_dates_out_of_range_serials():
+    result, invalid = convert_received_dates([20240305, 99999999, 0, 45000, float("inf"), -5])
+    assert invalid.tolist() == [True, True, True, False, True, True]
+    assert result.iloc[3] == pd.Timestamp(2023, 3, 15)
+    assert result.drop(index=3).isna().all()
+
+
+def test_prepare_inventory_frame_out_of_range_serial_is_row_error():
+    df = pd.DataFrame({"name": ["a", "b"], "quantity": [1, 1], "price": [1, 1], "received_date": [45000, 20240305]})
+    prepared, errors = prepare_inventory_frame(df, UPLOAD_TIME)
+    assert prepared["name"].tolist() == ["a"]
+    assert errors == [(3, "received_date: некорректная дата")]
+
+
+def test_prepare_inventory_frame_defaults():
+    df = normalize_columns(pd.DataFrame({" Name ": ["a"], "QUANTITY": [3.7], "price": [10]}))
+    prepared, errors = prepare_inventory_frame(df, UPLOAD_TIME)
+    assert errors == []
+    row = prepared.iloc[0]
+    assert row["quantity"] == 3
+    assert row["shelf_life_months"] == 12
+    assert row["usage_probability"] == 100
+    assert pd.isna(row["market_price"])
+    assert row["upload_timestamp"] == UPLOAD_TIME
+
+
+def test_prepare_inventory_frame_reports_row_errors():
+    df = pd.DataFrame({
+        "name": ["ok", None, "bad qty", "neg", "no price", "bad date", "  "],
+        "quantity": [1, 1, "x", -1, 1, 1, 1],
+        "price": [1, 1, 1, 1, None, 1, 1],
+        "received_date": ["01.02.2024", None, None, None, None, "31.02.2024", None],
+    })
+    prepared, errors = prepare_inventory_frame(df, UPLOAD_TIME)
+    assert prepared["name"].tolist() == ["ok"]
+    assert {row for row, _ in errors} == {3, 4, 5, 6, 7, 8}
+    assert (3, "name: значение отсутствует") in errors
+    assert (8, "name: значение отсутствует") in errors
+    assert (7, "received_date: некорректная дата") in errors
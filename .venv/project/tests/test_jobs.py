@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from utils.jobs import CANCELLED, DONE, QUEUED, RUNNING, JobLimitError, JobManager
+
+TIMEOUT = 5
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + TIMEOUT
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("условие не выполнено за отведённое время")
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(max_concurrent=1, max_pending=2)
+    yield manager
+    manager.shutdown()
+
+
+def blocking_job(started, release):
+    def run(job):
+        started.set()
+        release.wait(TIMEOUT)
+        return 'готово'
+    return run
+
+
+def test_submit_runs_job_and_stores_result(manager):
+    job = manager.submit('test', lambda job, x: x * 2, 21)
+    job.future.result(TIMEOUT)
+    assert job.status == DONE
+    assert job.result == 42
+    assert manager.get(job.id) is job
+
+
+def test_pending_limit(manager):
+    started, release = threading.Event(), threading.Event()
+    first = manager.submit('test', blocking_job(started, release))
+    second = manager.submit('test', blocking_job(threading.Event(), release))
+    with pytest.raises(JobLimitError):
+        manager.submit('test', lambda job: None)
+
+    release.set()
+    first.future.result(TIMEOUT)
+    second.future.result(TIMEOUT)
+    # Завершённые задачи не занимают место в очереди
+    manager.submit('test', lambda job: None).future.result(TIMEOUT)
+
+
+def test_cancel_queued_job(manager):
+    started, release = threading.Event(), threading.Event()
+    running = manager.submit('test', blocking_job(started, release))
+    assert started.wait(TIMEOUT)
+    calls = []
+    queued = manager.submit('test', lambda job: calls.append(job))
+    assert queued.status == QUEUED
+
+    assert manager.cancel(queued.id)
+    assert queued.status == CANCELLED
+    release.set()
+    running.future.result(TIMEOUT)
+    assert calls == []
+    assert not manager.cancel(queued.id)
+
+
+def test_cancel_running_job_stops_at_progress_check(manager):
+    started = threading.Event()
+
+    def run(job):
+        started.set()
+        for done in range(1000):
+            job.set_progress(done, 1000)
+            time.sleep(0.01)
+        return 'не должно завершиться'
+
+    job = manager.submit('test', run)
+    assert started.wait(TIMEOUT)
+    assert job.status == RUNNING
+
+    assert manager.cancel(job.id)
+    wait_for(lambda: job.finished_at is not None)
+    assert job.status == CANCELLED
+    assert job.result is None
+    assert job.done < 1000
+    assert not manager.cancel(job.id)
+
+
+def test_cancel_unknown_job(manager):
+    assert not manager.cancel('нет-такой')
@@ -0,0 +1,40 @@
+from utils import profiling
+
+
+class FakeCursor:
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, params):
+        pass
+
+    def callproc(self, name, params=None):
+        pass
+
+    def copy_expert(self, sql, file):
+        pass
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchmany(self, size):
+        return [(1,)] * size
+
+    def fetchall(self):
+        return [(1,)]
+
+
+def test_fetches_are_timed_but_not_counted_as_queries():
+    cur = profiling.timed_cursor_class(FakeCursor)()
+    token = profiling._db_time.set([0.0, 0])
+    try:
+        cur.execute('SELECT 1')
+        cur.fetchone()
+        cur.fetchmany(10)
+        cur.fetchall()
+        cur.copy_expert('COPY t FROM STDIN', None)
+        db, queries = profiling._db_time.get()
+    finally:
+        profiling._db_time.reset(token)
+    assert queries == 2
+    assert db > 0
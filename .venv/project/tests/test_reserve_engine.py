@@ -0,0 +1,132 @@
+import random
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from utils.reserve_logic import calculate_reserve
+from utils.reserve_engine import (METHODS, items_to_frame, calculate_reserves_frame,
+                                  input_fingerprints, months_elapsed, round2)
+
+
+def make_items(n, seed=0):
+    rnd = random.Random(seed)
+    today = date.today()
+    items = []
+    for i in range(n):
+        price = round(rnd.uniform(0, 5000), 2)
+        items.append({
+            "id": i + 1,
+            "name": f"item-{i}",
+            "category": rnd.choice(["A", "B", None]),
+            "quantity": rnd.randint(0, 500),
+            "price": price,
+            "shelf_life_months": rnd.choice([0, 1, 6, 12, 24, 36]),
+            "received_date": today - timedelta(days=rnd.randint(-60, 2000)),
+            "usage_probability": rnd.choice([0, 25.5, 50, 99.9, 100]),
+            "market_price": rnd.choice([None, 0, round(price * rnd.uniform(0.3, 1.5), 2)]),
+        })
+    return items
+
+
+def reference(items, method):
+    return np.array([calculate_reserve(item, override_method=method) for item in items], dtype=float)
+
+
+@pytest.mark.parametrize("method", METHODS + (None,))
+def test_engine_matches_reference(method):
+    items = make_items(500)
+    result = calculate_reserves_frame(items_to_frame(items), method)
+    assert np.array_equal(result, reference(items, method))
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_engine_matches_reference_for_datetime_and_string_dates(method):
+    items = make_items(100, seed=1)
+    for i, item in enumerate(items):
+        if i % 3 == 0:
+            item["received_date"] = datetime.combine(item["received_date"], datetime.min.time())
+        elif i % 3 == 1:
+            item["received_date"] = item["received_date"].strftime("%Y-%m-%d")
+        else:
+            item["received_date"] = "не дата"
+    result = calculate_reserves_frame(items_to_frame(items), method)
+    assert np.array_equal(result, reference(items, method))
+
+
+def test_result_capped_by_max_reserve():
+    items = make_items(200, seed=2)
+    result = calculate_reserves_frame(items_to_frame(items), "conservative")
+    max_reserve = np.array([item["quantity"] * item["price"] for item in items])
+    assert (result <= max_reserve).all()
+
+
+def test_missing_usage_probability_column_defaults_to_100():
+    items = make_items(20, seed=3)
+    for item in items:
+        del item["usage_probability"]
+    result = calculate_reserves_frame(items_to_frame(items), "standard")
+    assert np.array_equal(result, reference(items, "standard"))
+
+
+@pytest.mark.parametrize("field, value", [
+    ("quantity", -1),
+    ("price", -0.01),
+    ("shelf_life_months", -12),
+    ("usage_probability", 101),
+    ("received_date", None),
+])
+def test_invalid_items_rejected_like_reference(field, value):
+    items = make_items(10, seed=4)
+    items[5][field] = value
+    with pytest.raises(ValueError):
+        calculate_reserve(items[5], override_method="market")
+    with pytest.raises(ValueError):
+        calculate_reserves_frame(items_to_frame(items), "market")
+
+
+def test_months_elapsed():
+    today = datetime(2025, 6, 15)
+    result = months_elapsed([date(2025, 6, 1), date(2024, 12, 31), "2023-01-10 12:00:00", "bad"], today)
+    assert result.tolist() == [0, 6, 29, 0]
+
+
+def test_round2_matches_builtin_round():
+    values = np.array([0.125, 0.135, 2.675, 1.005, 10.0049999, 123456.785, 0.0])
+    assert round2(values).tolist() == [round(v, 2) for v in values.tolist()]
+
+
+def test_input_fingerprints_stable_across_date_representations():
+    today = datetime(2025, 6, 15)
+    items = make_items(30, seed=5)
+    as_strings = [dict(item, received_date=item["received_date"].strftime("%Y-%m-%d")) for item in items]
+    first = input_fingerprints(items_to_frame(items), "standard", today)
+    assert first.tolist() == input_fingerprints(items_to_frame(items), "standard", today).tolist()
+    assert first.tolist() == input_fingerprints(items_to_frame(as_strings), "standard", today).tolist()
+    assert len(set(first.tolist())) == len(items)
+
+
+@pytest.mark.parametrize("field, value", [
+    ("quantity", 999),
+    ("price", 0.01),
+    ("shelf_life_months", 48),
+    ("received_date", date(2020, 1, 1)),
+    ("usage_probability", 1),
+    ("market_price", 1.5),
+])
+def test_input_fingerprints_change_with_inputs(field, value):
+    today = datetime(2025, 6, 15)
+    items = make_items(10, seed=6)
+    before = input_fingerprints(items_to_frame(items), "standard", today)
+    items[3][field] = value
+    after = input_fingerprints(items_to_frame(items), "standard", today)
+    assert (before != after).tolist() == [i == 3 for i in range(10)]
+
+
+def test_input_fingerprints_change_with_method_and_month():
+    items = make_items(10, seed=7)
+    df = items_to_frame(items)
+    base = input_fingerprints(df, "standard", datetime(2025, 6, 15))
+    assert (base == input_fingerprints(df, "standard", datetime(2025, 6, 30))).all()
+    assert (base != input_fingerprints(df, "market", datetime(2025, 6, 15))).all()
+    assert (base != input_fingerprints(df, "standard", datetime(2025, 7, 1))).all()
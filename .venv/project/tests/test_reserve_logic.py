@@ -0,0 +1,122 @@
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import pytest
+
+import utils.reserve_logic as reserve_logic
+from utils.reserve_engine import items_to_frame, input_fingerprints
+from utils.reserve_queries import NULL_DATE_KEY, fetch_latest_calculations, fetch_reserves_page
+
+COLUMNS = ["id", "name", "quantity", "price", "shelf_life_months", "received_date",
+           "usage_probability", "market_price", "upload_timestamp"]
+
+
+def make_rows(n):
+    return [(i, f"item-{i}", 10, 100.0, 12, date(2024, 1, 1), 50, None, None) for i in range(1, n + 1)]
+
+
+class FakeCursor:
+    def __init__(self, rows=()):
+        self.rows = list(rows)
+        self.description = [SimpleNamespace(name=name) for name in COLUMNS]
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Заменитель соединения: SELECT inventory_items отдаёт заданные строки."""
+
+    def __init__(self, rows=()):
+        self.rows = rows
+        self.cursors = []
+        self.commits = self.rollbacks = 0
+
+    def cursor(self, cursor_factory=None):
+        cur = FakeCursor(self.rows)
+        self.cursors.append(cur)
+        return cur
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def written(monkeypatch):
+    rows = []
+    monkeypatch.setattr(reserve_logic, "upsert_reserves", lambda cur, batch: rows.extend(batch))
+    return rows
+
+
+def stub_latest(monkeypatch, latest):
+    calls = []
+
+    def fetch(conn, method, item_ids=None):
+        calls.append(method)
+        return latest
+
+    monkeypatch.setattr(reserve_logic, "fetch_latest_calculations", fetch)
+    return calls
+
+
+def test_incremental_skips_items_with_unchanged_fingerprint(monkeypatch, written):
+    rows = make_rows(6)
+    fingerprints = input_fingerprints(items_to_frame(rows, columns=COLUMNS), "standard", datetime.today())
+    # Позиции 1 и 4 не изменились, у 2 отпечаток другой, по остальным расчётов нет
+    calls = stub_latest(monkeypatch, {1: (5.0, fingerprints[0]), 2: (5.0, "changed"), 4: (5.0, fingerprints[3])})
+
+    stats = reserve_logic.calculate_reserves(FakeConnection(rows), "standard", incremental=True, audit=False)
+
+    assert stats == {"calculated": 4, "skipped": 2}
+    assert [row[0] for row in written] == [2, 3, 5, 6]
+    assert calls == ["standard"]
+
+
+def test_full_run_recalculates_everything(monkeypatch, written):
+    rows = make_rows(4)
+    fingerprints = input_fingerprints(items_to_frame(rows, columns=COLUMNS), "market", datetime.today())
+    stub_latest(monkeypatch, {item_id: (0.0, fp) for item_id, fp in zip(range(1, 5), fingerprints)})
+
+    stats = reserve_logic.calculate_reserves(FakeConnection(rows), "market", audit=False)
+
+    assert stats == {"calculated": 4, "skipped": 0}
+    assert [row[0] for row in written] == [1, 2, 3, 4]
+    assert [row[4] for row in written] == fingerprints.tolist()
+
+
+def test_fetch_latest_calculations_filters_by_method():
+    conn = FakeConnection()
+    fetch_latest_calculations(conn, "standard", [3, 1])
+    sql, params = conn.cursors[0].executed[0]
+    assert "method_used = %s" in sql
+    assert params == ["standard", [3, 1]]
+
+    conn = FakeConnection()
+    fetch_latest_calculations(conn, None)
+    sql, params = conn.cursors[0].executed[0]
+    assert "method_used IS NULL" in sql
+    assert params == []
+
+
+def test_reserves_page_key_for_null_calculation_date():
+    rows = [{"id": 7, "name": None, "calculation_date": None}, {"id": 8, "name": "b", "calculation_date": date(2025, 1, 2)}]
+    page, next_after = fetch_reserves_page(FakeConnection(rows), limit=1)
+    assert page == rows[:1]
+    assert next_after == (NULL_DATE_KEY, "", 7)
+
+    conn = FakeConnection(rows[1:])
+    page, next_after = fetch_reserves_page(conn, after=next_after, limit=1)
+    sql, params = conn.cursors[0].executed[0]
+    assert "COALESCE(r.calculation_date" in sql
+    assert params == [NULL_DATE_KEY, NULL_DATE_KEY, "", 7, 2]
+    assert next_after is None
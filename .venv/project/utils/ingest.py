@@ -0,0 +1,185 @@
+from datetime import datetime
+from io import StringIO
+import numpy as np
+import pandas as pd
+
+# Пакетная загрузка МПЗ из Excel/CSV: нормализация и проверка всей таблицы
+# векторно, затем одна команда COPY в inventory_items в рамках одной транзакции.
+
+REQUIRED_COLUMNS = ['name', 'quantity', 'price']
+
+INVENTORY_COPY_COLUMNS = ['name', 'category', 'quantity', 'price', 'shelf_life_months',
+                          'received_date', 'usage_probability', 'market_price', 'upload_timestamp']
+
+# Значения по умолчанию для отсутствующих в файле столбцов
+COLUMN_DEFAULTS = {
+    'category': None,
+    'quantity': 0,
+    'shelf_life_months': 12,
+    'received_date': None,
+    'usage_probability': 100,
+    'market_price': None,
+}
+
+EXCEL_EPOCH = pd.Timestamp(1899, 12, 30)
+# Допустимые серийные номера Excel: 1 — 1900-01-01, 2958465 — 9999-12-31
+EXCEL_SERIAL_RANGE = (1, 2958465)
+
+# Допустимые форматы дат в текстовом виде; день всегда перед месяцем
+RECEIVED_DATE_FORMATS = ['%d.%m.%Y', '%d.%m.%Y %H:%M:%S', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S']
+
+
+def read_upload_frame(filename, stream):
+    """Чтение загруженного файла .csv/.xlsx/.xls в DataFrame."""
+    if filename.endswith('.csv'):
+        return pd.read_csv(stream)
+    return pd.read_excel(stream)
+
+
+def normalize_columns(df):
+    """Приведение заголовков к нижнему регистру без пробелов по краям."""
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    return df
+
+
+def convert_received_dates(values):
+    """Векторное преобразование received_date.
+
+    Поддерживаются серийные номера Excel, datetime и строки в форматах
+    RECEIVED_DATE_FORMATS. Возвращает
+    Series datetime64 (NaT для пустых и нераспознанных значений) и маску
+    нераспознанных непустых значений, включая числа вне EXCEL_SERIAL_RANGE.
+    """
+    values = pd.Series(values)
+    result = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    empty = values.isna().to_numpy()
+
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return pd.to_datetime(values), np.zeros(len(values), dtype=bool)
+
+    if pd.api.types.is_numeric_dtype(values):
+        numeric = ~empty
+    else:
+        numeric = values.map(lambda v: isinstance(v, (int, float, np.number))
+                             and not isinstance(v, bool)).to_numpy() & ~empty
+    bad_serial = np.zeros(len(values), dtype=bool)
+    if numeric.any():
+        serials = pd.to_numeric(values[numeric]).astype('float64')
+        # Числа вне диапазона (например, 20240305 как ггггммдд) — ошибка строки, а не всей загрузки
+        in_range = serials.between(*EXCEL_SERIAL_RANGE).to_numpy()
+        bad_serial[np.flatnonzero(numeric)[~in_range]] = True
+        numeric &= ~bad_serial
+        days = serials[in_range].astype('int64')
+        result[numeric] = EXCEL_EPOCH + pd.to_timedelta(days, unit='D')
+
+    rest = ~numeric & ~empty & ~bad_serial
+    if rest.any():
+        text = values[rest].astype(str).str.strip()
+        parsed = pd.Series(pd.NaT, index=text.index, dtype='datetime64[ns]')
+        for fmt in RECEIVED_DATE_FORMATS:
+            pending = parsed.isna()
+            if not pending.any():
+                break
+            parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+        result[rest] = parsed
+
+    invalid = bad_serial | (rest & result.isna().to_numpy())
+    return result, invalid
+
+
+def _numeric(df, column, errors, label):
+    """Числовой столбец; нечисловые значения регистрируются как ошибки строк."""
+    raw = df[column]
+    values = pd.to_numeric(raw, errors='coerce')
+    bad = values.isna() & raw.notna()
+    for idx in np.flatnonzero(bad.to_numpy()):
+        errors.append((idx, f'{label}: некорректное значение "{raw.iloc[idx]}"'))
+    return values
+
+
+def prepare_inventory_frame(df, upload_time):
+    """Нормализация и проверка таблицы МПЗ.
+
+    Возвращает DataFrame со столбцами INVENTORY_COPY_COLUMNS (только корректные
+    строки) и список ошибок [(номер строки в файле, сообщение)].
+    """
+    df = df.reset_index(drop=True)
+    for column, default in COLUMN_DEFAULTS.items():
+        if column not in df.columns:
+            df[column] = default
+
+    errors = []
+    quantity = _numeric(df, 'quantity', errors, 'quantity')
+    price = _numeric(df, 'price', errors, 'price')
+    shelf_life = _numeric(df, 'shelf_life_months', errors, 'shelf_life_months') \
+        .fillna(COLUMN_DEFAULTS['shelf_life_months'])
+    usage = _numeric(df, 'usage_probability', errors, 'usage_probability') \
+        .fillna(COLUMN_DEFAULTS['usage_probability'])
+    market_price = _numeric(df, 'market_price', errors, 'market_price')
+    received, bad_dates = convert_received_dates(df['received_date'])
+
+    checks = [
+        (df['name'].isna() | (df['name'].astype(str).str.strip() == ''), 'name: значение отсутствует'),
+        (df['quantity'].isna(), 'quantity: значение отсутствует'),
+        (df['price'].isna(), 'price: значение отсутствует'),
+        (quantity < 0, 'Количество не может быть отрицательным'),
+        (price < 0, 'Цена не может быть отрицательной'),
+        (shelf_life < 0, 'Срок хранения не может быть отрицательным'),
+        ((usage < 0) | (usage > 100), 'Вероятность использования должна быть в диапазоне [0, 100]'),
+        (pd.Series(bad_dates), 'received_date: некорректная дата'),
+    ]
+    for mask, message in checks:
+        for idx in np.flatnonzero(mask.to_numpy()):
+            errors.append((idx, message))
+
+    bad_rows = {idx for idx, _ in errors}
+    valid = np.ones(len(df), dtype=bool)
+    valid[list(bad_rows)] = False
+
+    prepared = pd.DataFrame({
+        'name': df['name'],
+        'category': df['category'],
+        'quantity': np.trunc(quantity).astype('Int64'),
+        'price': price,
+        'shelf_life_months': np.trunc(shelf_life).astype('Int64'),
+        'received_date': received,
+        'usage_probability': usage,
+        'market_price': market_price,
+        'upload_timestamp': upload_time,
+    })[valid]
+
+    # Номера строк как в Excel: заголовок — первая строка
+    row_errors = sorted((int(idx) + 2, message) for idx, message in errors)
+    return prepared, row_errors
+
+
+def copy_inventory_items(cur, prepared):
+    """Потоковая запись подготовленной таблицы в inventory_items через COPY FROM STDIN."""
+    buffer = StringIO()
+    prepared.to_csv(buffer, header=False, index=False, na_rep='',
+                    date_format='%Y-%m-%d %H:%M:%S.%f')
+    buffer.seek(0)
+    cur.copy_expert(
+        f"COPY inventory_items ({', '.join(INVENTORY_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer)
+    return len(prepared)
+
+
+def ingest_inventory(conn, df, upload_time=None):
+    """Загрузка таблицы МПЗ одной транзакцией.
+
+    Строки с ошибками пропускаются; возвращает (число загруженных строк, ошибки).
+    """
+    upload_time = upload_time or datetime.now()
+    prepared, row_errors = prepare_inventory_frame(normalize_columns(df), upload_time)
+
+    cur = conn.cursor()
+    try:
+        inserted = copy_inventory_items(cur, prepared) if len(prepared) else 0
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+    return inserted, row_errors
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+import psycopg2.extras
+
+# Постраничная выборка МПЗ с фильтрацией на стороне БД.
+# Пагинация по ключу (keyset): следующая страница начинается после последнего id.
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+UPLOAD_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def parse_page_size(value):
+    """Размер страницы из параметра запроса с ограничением сверху."""
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def upload_time_range(upload_time_str):
+    """Границы документа загрузки [t, t + 1 с) по строке YYYY-MM-DD HH:MM:SS."""
+    start = datetime.strptime(upload_time_str, UPLOAD_TIME_FORMAT)
+    return start, start + timedelta(seconds=1)
+
+
+def inventory_filters(upload_time=None, category=None, alias=''):
+    """Условия WHERE и параметры для фильтров по документу и категории."""
+    prefix = f'{alias}.' if alias else ''
+    conditions, params = [], []
+    if upload_time:
+        start, end = upload_time_range(upload_time)
+        conditions.append(f'{prefix}upload_timestamp >= %s AND {prefix}upload_timestamp < %s')
+        params.extend([start, end])
+    if category:
+        conditions.append(f'{prefix}category = %s')
+        params.append(category)
+    return conditions, params
+
+
+def where_clause(conditions):
+    """Сборка WHERE из списка условий."""
+    return 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+
+
+def fetch_upload_groups(conn, category=None):
+    """Документы загрузки с числом позиций одним GROUP BY: [(upload_time, count)]."""
+    conditions, params = inventory_filters(category=category)
+    cur = conn.cursor()
+    try:
+        cur.execute(f'''
+            SELECT DATE_TRUNC('second', upload_timestamp) AS upload_time, COUNT(*)
+            FROM inventory_items
+            {where_clause(conditions)}
+            GROUP BY 1
+            ORDER BY 1
+        ''', params)
+        return [
+            (upload_time.strftime(UPLOAD_TIME_FORMAT) if upload_time else 'Без даты', count)
+            for upload_time, count in cur.fetchall()
+        ]
+    finally:
+        cur.close()
+
+
+def fetch_inventory_page(conn, upload_time=None, category=None, after_id=None, limit=DEFAULT_PAGE_SIZE):
+    """Страница МПЗ после позиции after_id.
+
+    Возвращает (строки, after_id для следующей страницы или None).
+    """
+    conditions, params = inventory_filters(upload_time, category)
+    if after_id is not None:
+        conditions.append('id > %s')
+        params.append(after_id)
+
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cur.execute(f'''
+            SELECT * FROM inventory_items
+            {where_clause(conditions)}
+            ORDER BY id
+            LIMIT %s
+        ''', params + [limit + 1])
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    next_after = rows[limit - 1]['id'] if len(rows) > limit else None
+    return rows[:limit], next_after
+
+
+def fetch_categories(conn):
+    """Список категорий МПЗ для фильтра."""
+    cur = conn.cursor()
+    try:
+        cur.execute('SELECT DISTINCT category FROM inventory_items WHERE category IS NOT NULL ORDER BY 1')
+        return [row[0] for row in cur.fetchall()]
+    finally:
+        cur.close()
@@ -0,0 +1,178 @@
+import os
+import uuid
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Фоновые задачи внутри процесса приложения: длительные расчёты и загрузки
+# выполняются в пуле потоков, HTTP-запрос только ставит задачу в очередь.
+
+JOBS_MAX_CONCURRENT = int(os.environ.get('JOBS_MAX_CONCURRENT', 2))
+JOBS_MAX_PENDING = int(os.environ.get('JOBS_MAX_PENDING', 20))
+JOBS_KEEP_FINISHED = int(os.environ.get('JOBS_KEEP_FINISHED', 100))
+JOBS_CPU_WORKERS = int(os.environ.get('JOBS_CPU_WORKERS', os.cpu_count() or 1))
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем."""
+
+
+class JobLimitError(RuntimeError):
+    """Превышено число задач в очереди."""
+
+
+class Job:
+    """Фоновая задача: статус, прогресс и результат."""
+
+    def __init__(self, kind, description=''):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.description = description
+        self.status = QUEUED
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+        self._cancel = threading.Event()
+
+    def set_progress(self, done, total=None):
+        """Обновление прогресса; заодно точка проверки отмены."""
+        self.update_progress(done, total)
+        self.check_cancelled()
+
+    def update_progress(self, done, total=None):
+        """Обновление прогресса без проверки отмены — для уже зафиксированной работы."""
+        self.done = done
+        if total is not None:
+            self.total = total
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled("Задача отменена")
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'status': self.status,
+            'progress': {'done': self.done, 'total': self.total},
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat(),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+class JobManager:
+    """Очередь фоновых задач с ограничением числа одновременно выполняемых."""
+
+    def __init__(self, max_concurrent=JOBS_MAX_CONCURRENT, max_pending=JOBS_MAX_PENDING,
+                 keep_finished=JOBS_KEEP_FINISHED):
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_pending = max_pending
+        self.keep_finished = keep_finished
+
+    def submit(self, kind, fn, *args, description='', **kwargs):
+        """Постановка задачи в очередь; fn(job, *args, **kwargs) выполняется в фоне."""
+        job = Job(kind, description)
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if j.status in ACTIVE_STATUSES)
+            if active >= self.max_pending:
+                raise JobLimitError(f"Слишком много задач в очереди ({active})")
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancel_requested:
+            job.status, job.finished_at = CANCELLED, datetime.now()
+            return
+        job.status, job.started_at = RUNNING, datetime.now()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+            logging.info("Задача %s (%s) отменена", job.id, job.kind)
+        except Exception as e:
+            job.status, job.error = FAILED, str(e)
+            logging.error("Ошибка в задаче %s (%s): %s", job.id, job.kind, e)
+        finally:
+            job.finished_at = datetime.now()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.status not in ACTIVE_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Запрос отмены: задача в очереди не запустится, выполняемая остановится
+        на ближайшей проверке прогресса. Возвращает False, если задачи нет или она завершена."""
+        job = self.get(job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return False
+        job._cancel.set()
+        if job.future is not None and job.future.cancel():
+            job.status, job.finished_at = CANCELLED, datetime.now()
+        return True
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_manager = None
+_cpu_pool = None
+_init_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Общий менеджер задач процесса."""
+    global _manager
+    if _manager is None:
+        with _init_lock:
+            if _manager is None:
+                _manager = JobManager()
+    return _manager
+
+
+def get_cpu_pool():
+    """Пул процессов для параллельного расчёта порций позиций на всех ядрах.
+
+    Пул создаётся из потока задачи, когда в процессе уже работают другие потоки
+    (QueueListener, задачи, сервер), поэтому процессы запускаются через spawn:
+    fork многопоточного процесса может оставить в дочернем захваченные блокировки.
+    """
+    global _cpu_pool
+    if _cpu_pool is None:
+        with _init_lock:
+            if _cpu_pool is None:
+                _cpu_pool = ProcessPoolExecutor(max_workers=JOBS_CPU_WORKERS,
+                                                mp_context=multiprocessing.get_context('spawn'))
+    return _cpu_pool
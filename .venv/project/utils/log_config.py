@@ -0,0 +1,79 @@
+import os
+import copy
+import json
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+# Асинхронное логирование: обработчики в потоках приложения только кладут
+# запись в очередь, запись в файл выполняет отдельный поток QueueListener.
+# Записи пишутся в файл как JSON, по строке на запись.
+
+LOG_FILE = os.environ.get('LOG_FILE', 'reserve_bot.log')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись лога в одну строку JSON; поля из extra={'data': {...}} попадают в data."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        data = getattr(record, 'data', None)
+        if data:
+            entry['data'] = data
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    """QueueHandler, сохраняющий трассировку исключения отдельным полем.
+
+    Стандартный prepare() дописывает трассировку в текст сообщения и очищает
+    exc_info; здесь сообщение остаётся как есть, а трассировка уходит в exc_text.
+    """
+
+    def prepare(self, record):
+        exc_text = record.exc_text
+        if record.exc_info and not exc_text:
+            exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        record.exc_text = exc_text
+        return record
+
+
+def setup_logging(filename=LOG_FILE, level=LOG_LEVEL):
+    """Настройка корневого логгера через QueueHandler/QueueListener.
+
+    Повторные вызовы ничего не меняют, поэтому модули могут вызывать её при импорте.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+        file_handler = logging.FileHandler(filename, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        root.addHandler(StructuredQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
@@ -0,0 +1,51 @@
+import os
+import logging
+
+# Применение SQL-миграций из каталога migrations/ по порядку имён файлов.
+# Применённые миграции фиксируются в таблице schema_migrations.
+# Запуск из корня проекта: python -m utils.migrations
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """Применение ещё не выполненных миграций; возвращает список применённых файлов."""
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                name TEXT PRIMARY KEY,
+                applied_at TIMESTAMP NOT NULL DEFAULT now()
+            )
+        ''')
+        cur.execute('SELECT name FROM schema_migrations')
+        applied = {row[0] for row in cur.fetchall()}
+
+        new = []
+        for name in sorted(os.listdir(migrations_dir)):
+            if not name.endswith('.sql') or name in applied:
+                continue
+            with open(os.path.join(migrations_dir, name), encoding='utf-8') as f:
+                cur.execute(f.read())
+            cur.execute('INSERT INTO schema_migrations (name) VALUES (%s)', (name,))
+            new.append(name)
+            logging.info("Применена миграция %s", name)
+
+        conn.commit()
+        return new
+    except Exception as e:
+        conn.rollback()
+        logging.error("Ошибка при применении миграций: %s", e)
+        raise
+    finally:
+        cur.close()
+
+
+if __name__ == '__main__':
+    from db_connect import get_db_connection
+
+    conn = get_db_connection()
+    try:
+        print(apply_migrations(conn) or 'Новых миграций нет')
+    finally:
+        conn.close()
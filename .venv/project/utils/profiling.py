@@ -0,0 +1,134 @@
+import os
+import time
+import threading
+from contextvars import ContextVar
+import psycopg2.extensions
+
+# Замер времени запросов: сколько времени маршрут провёл в БД и сколько в Python.
+# Включается переменной окружения PROFILING=1; результаты отдаются в заголовке
+# Server-Timing и агрегируются для /metrics.
+
+PROFILING_ENABLED = os.environ.get('PROFILING', '0') == '1'
+
+# Накопленное время обращений к БД (секунды) в текущем запросе/задаче
+_db_time = ContextVar('db_time', default=None)
+
+
+def _record_db_time(elapsed, query=True):
+    acc = _db_time.get()
+    if acc is not None:
+        acc[0] += elapsed
+        if query:
+            acc[1] += 1
+
+
+def _timed(method, query=True):
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            _record_db_time(time.perf_counter() - start, query)
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+_timed_cursor_classes = {}
+_timed_classes_lock = threading.Lock()
+
+
+def timed_cursor_class(base):
+    """Подкласс курсора base, замеряющий execute/copy и чтение именованных курсоров.
+
+    Запросами считаются только execute/executemany/callproc/copy_expert;
+    время fetch* учитывается без увеличения счётчика.
+    """
+    with _timed_classes_lock:
+        cls = _timed_cursor_classes.get(base)
+        if cls is None:
+            queries = ('execute', 'executemany', 'callproc', 'copy_expert')
+            fetches = ('fetchone', 'fetchmany', 'fetchall')
+            methods = {name: _timed(getattr(base, name)) for name in queries}
+            methods.update({name: _timed(getattr(base, name), query=False) for name in fetches})
+            cls = type(f'Timed{base.__name__}', (base,), methods)
+            _timed_cursor_classes[base] = cls
+        return cls
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Соединение, курсоры которого учитывают время обращений к БД."""
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = timed_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            _record_db_time(time.perf_counter() - start, query=False)
+
+
+class RouteStats:
+    """Агрегированные замеры по маршрутам."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def add(self, endpoint, total, db, queries):
+        with self._lock:
+            stats = self._routes.setdefault(endpoint, {
+                'requests': 0, 'total_s': 0.0, 'db_s': 0.0, 'python_s': 0.0, 'queries': 0, 'max_s': 0.0,
+            })
+            stats['requests'] += 1
+            stats['total_s'] += total
+            stats['db_s'] += db
+            stats['python_s'] += total - db
+            stats['queries'] += queries
+            stats['max_s'] = max(stats['max_s'], total)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(
+                    {key: round(value, 6) if isinstance(value, float) else value for key, value in stats.items()},
+                    avg_s=round(stats['total_s'] / stats['requests'], 6),
+                )
+                for endpoint, stats in self._routes.items()
+            }
+
+
+route_stats = RouteStats()
+
+
+def init_app(app):
+    """Подключение замеров к Flask-приложению (только при PROFILING=1)."""
+    if not PROFILING_ENABLED:
+        return
+    from flask import g, request
+
+    @app.before_request
+    def _start_timing():
+        g.profiling_start = time.perf_counter()
+        g.profiling_token = _db_time.set([0.0, 0])
+
+    @app.after_request
+    def _finish_timing(response):
+        start = g.pop('profiling_start', None)
+        token = g.pop('profiling_token', None)
+        if start is None:
+            return response
+        total = time.perf_counter() - start
+        db, queries = _db_time.get() or (0.0, 0)
+        _db_time.reset(token)
+
+        response.headers['Server-Timing'] = (
+            f'db;desc="PostgreSQL ({queries})";dur={db * 1000:.1f}, '
+            f'app;desc="Python";dur={(total - db) * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        route_stats.add(request.endpoint or request.path, total, db, queries)
+        return response
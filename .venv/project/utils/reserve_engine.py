@@ -0,0 +1,158 @@
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+# Векторизованный расчёт резервов по всей выборке МПЗ.
+# Эталонная построчная реализация — utils.reserve_logic.calculate_reserve,
+# результаты обоих вариантов должны совпадать (см. tests/test_reserve_engine.py).
+
+ITEM_COLUMNS = ["id", "name", "quantity", "price", "shelf_life_months",
+                "received_date", "usage_probability", "market_price"]
+
+METHODS = ("standard", "shelf_life", "market", "conservative")
+
+
+def items_to_frame(rows, columns=None):
+    """Преобразование строк inventory_items (dict/DictRow/tuple) в DataFrame."""
+    if columns is not None:
+        df = pd.DataFrame.from_records(rows, columns=columns)
+    else:
+        df = pd.DataFrame.from_records([dict(row) for row in rows])
+    for col in ITEM_COLUMNS:
+        if col not in df.columns:
+            # как item.get("usage_probability", 100) в calculate_reserve
+            df[col] = 100 if col == "usage_probability" else None
+    return df
+
+
+def _float_column(df, column):
+    """Колонка как float64, None заменяется на NaN."""
+    return pd.to_numeric(df[column], errors="coerce").to_numpy(dtype="float64")
+
+
+def validate_items_frame(df):
+    """Валидация всей выборки; ошибка выдаётся по первой некорректной позиции."""
+    def fail(mask, message):
+        if mask.any():
+            name = df["name"].iloc[int(np.argmax(mask))]
+            raise ValueError(f"{message} (товар {name})")
+
+    for field in ["quantity", "price", "shelf_life_months", "received_date"]:
+        fail(df[field].isna().to_numpy(), f"Поле {field} отсутствует или равно None")
+
+    fail(_float_column(df, "quantity") < 0, "Количество не может быть отрицательным")
+    fail(_float_column(df, "price") < 0, "Цена не может быть отрицательной")
+    fail(_float_column(df, "shelf_life_months") < 0, "Срок хранения не может быть отрицательным")
+
+    usage = _float_column(df, "usage_probability")
+    fail(~np.isnan(usage) & ((usage < 0) | (usage > 100)),
+         "Вероятность использования должна быть в диапазоне [0, 100]")
+
+
+def parse_received_dates(received):
+    """Даты поступления как datetime64; нераспознанные значения — NaT."""
+    received = pd.Series(received)
+    if pd.api.types.is_datetime64_any_dtype(received):
+        return received
+    if pd.api.types.infer_dtype(received, skipna=False) in ("date", "datetime"):
+        # Строки БД приходят как date/datetime — разбор через str() не нужен
+        return pd.to_datetime(received)
+    return pd.to_datetime(received.astype(str).str.split().str[0],
+                          format="%Y-%m-%d", errors="coerce")
+
+
+def months_elapsed(received, today=None):
+    """Число полных календарных месяцев с даты поступления до today.
+
+    Как и в calculate_reserve, некорректная дата заменяется текущей.
+    """
+    today = today or datetime.today()
+    parsed = parse_received_dates(received)
+    years = parsed.dt.year.to_numpy(dtype="float64")
+    months = parsed.dt.month.to_numpy(dtype="float64")
+    years = np.where(np.isnan(years), today.year, years)
+    months = np.where(np.isnan(months), today.month, months)
+    return (today.year - years) * 12 + (today.month - months)
+
+
+def round2(values):
+    """Округление до копеек, совпадающее со встроенным round(x, 2).
+
+    np.round масштабирует значение и может разойтись с round() на половинных
+    копейках, поэтому такие значения доокругляются построчно.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for idx in np.flatnonzero(ties):
+        rounded[idx] = round(float(values[idx]), 2)
+    return rounded
+
+
+def calculate_reserves_frame(df, method, today=None):
+    """Расчёт резервов для всех позиций DataFrame одним проходом.
+
+    Возвращает массив резервов в порядке строк df.
+    """
+    validate_items_frame(df)
+
+    qty = _float_column(df, "quantity")
+    price = _float_column(df, "price")
+    shelf_life = _float_column(df, "shelf_life_months")
+    usage_prob = _float_column(df, "usage_probability")
+    market_price = _float_column(df, "market_price")
+    has_market = ~np.isnan(market_price)
+    months = months_elapsed(df["received_date"], today)
+
+    max_reserve = qty * price
+    cost = qty * price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        market_part = np.where(has_market, np.maximum(price - market_price, 0) * qty, 0.0)
+
+        if method == "standard":
+            if np.isnan(usage_prob).any():
+                raise ValueError("Поле usage_probability отсутствует или равно None")
+            coef_storage = np.where(shelf_life > 0, np.minimum(1, months / shelf_life), 1.0)
+            reserve_by_usage = cost * coef_storage * (1 - usage_prob / 100)
+            reserve = np.maximum(reserve_by_usage, market_part)
+
+        elif method == "shelf_life":
+            coef_storage = np.where(shelf_life > 0, np.minimum(1, months / shelf_life), 1.0)
+            reserve = cost * coef_storage
+            reserve = np.where(has_market, np.minimum(reserve, market_part), reserve)
+
+        elif method == "market":
+            reserve = np.where(has_market & (market_price >= 0), market_part, 0.0)
+
+        elif method == "conservative":
+            coef = np.where(shelf_life > 0, np.minimum(1, months / (shelf_life * 1.5)), 0.0)
+            reserve = cost * coef
+            reserve = np.where(has_market, np.maximum(reserve, market_part), reserve)
+            reserve = np.where((shelf_life != 0) & (months > shelf_life), cost, reserve)
+
+        else:
+            reserve = np.zeros(len(df))
+
+    return np.minimum(round2(reserve), max_reserve)
+
+
+def input_fingerprints(df, method, today=None):
+    """Отпечатки входных данных расчёта для каждой позиции.
+
+    Учитываются количество, цена, срок хранения, дата поступления, вероятность
+    использования, рыночная цена, метод и число прошедших месяцев: если отпечаток
+    совпадает с сохранённым, резерв не изменился и пересчёт можно пропустить.
+    """
+    received = parse_received_dates(df["received_date"])
+    key = pd.DataFrame({
+        "quantity": _float_column(df, "quantity"),
+        "price": _float_column(df, "price"),
+        "shelf_life_months": _float_column(df, "shelf_life_months"),
+        "received_date": received.dt.strftime("%Y-%m-%d").fillna("").to_numpy(),
+        "usage_probability": _float_column(df, "usage_probability"),
+        "market_price": _float_column(df, "market_price"),
+        "method": method or "",
+        "months": months_elapsed(received, today),
+    })
+    hashes = pd.util.hash_pandas_object(key, index=False).to_numpy()
+    return np.array([format(value, "016x") for value in hashes.tolist()], dtype=object)
@@ -0,0 +1,146 @@
+import csv
+from datetime import datetime
+from io import StringIO
+import openpyxl
+from utils.inventory_queries import where_clause
+
+# Потоковая выгрузка истории резервов: строки читаются серверным курсором
+# порциями по EXPORT_CHUNK_SIZE, в память не загружается вся история.
+
+EXPORT_CHUNK_SIZE = 5000
+FILE_CHUNK_SIZE = 64 * 1024
+
+EXPORT_HEADERS = ['№', 'Наименование', 'Метод расчёта', 'Рассчитанный резерв']
+
+EXPORT_SQL = '''
+    SELECT r.calculation_date, i.name, r.method_used, r.calculated_reserve
+    FROM reserve_calculations r
+    JOIN inventory_items i ON r.item_id = i.id
+    {where}
+    ORDER BY r.calculation_date DESC, i.name
+'''
+
+
+def export_filters(date_from=None, date_to=None, method=None):
+    """Условия WHERE для выгрузки по диапазону дат расчёта и методу."""
+    conditions, params = [], []
+    if date_from:
+        conditions.append('r.calculation_date >= %s')
+        params.append(datetime.strptime(date_from, '%Y-%m-%d').date())
+    if date_to:
+        conditions.append('r.calculation_date <= %s')
+        params.append(datetime.strptime(date_to, '%Y-%m-%d').date())
+    if method:
+        conditions.append('r.method_used = %s')
+        params.append(method)
+    return conditions, params
+
+
+def _date_str(value):
+    return value.strftime('%Y-%m-%d') if value else '—'
+
+
+def iter_reserve_rows(conn, filters, chunk_size=EXPORT_CHUNK_SIZE):
+    """Строки выгрузки (calculation_date, name, method_used, calculated_reserve) через именованный курсор."""
+    conditions, params = filters
+    cur = conn.cursor(name='reserves_export')
+    try:
+        cur.execute(EXPORT_SQL.format(where=where_clause(conditions)), params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+
+
+def fetch_column_widths(conn, filters):
+    """Ширины столбцов для каждого листа одним агрегирующим запросом.
+
+    Ширина считается как в прежней выгрузке: длина самого длинного значения + 2,
+    где резерв — это str(float(value)). Postgres печатает целые float8 без «.0»
+    («100» вместо «100.0»), поэтому для них добавляются два символа; для значений
+    от 1e15 до 1e16 форматы Postgres и Python расходятся, такие резервы не ожидаются.
+    """
+    conditions, params = filters
+    cur = conn.cursor()
+    try:
+        cur.execute(f'''
+            SELECT r.calculation_date, COUNT(*),
+                   MAX(LENGTH(COALESCE(i.name, '—'))),
+                   MAX(LENGTH(r.method_used)),
+                   MAX(LENGTH(r.calculated_reserve::float8::text)
+                       + CASE WHEN r.calculated_reserve::float8::text ~ '^-?[0-9]+$' THEN 2 ELSE 0 END)
+            FROM reserve_calculations r
+            JOIN inventory_items i ON r.item_id = i.id
+            {where_clause(conditions)}
+            GROUP BY r.calculation_date
+        ''', params)
+        widths = {}
+        for calculation_date, count, name_len, method_len, reserve_len in cur.fetchall():
+            values = [len(str(count)), name_len or 0, method_len or 0, reserve_len or 0]
+            widths[_date_str(calculation_date)] = [
+                max(len(header), value) + 2 for header, value in zip(EXPORT_HEADERS, values)
+            ]
+        return widths
+    finally:
+        cur.close()
+
+
+def write_reserves_xlsx(conn, filters, fileobj):
+    """Выгрузка в xlsx (лист на каждую дату расчёта) в режиме write-only."""
+    widths = fetch_column_widths(conn, filters)
+    wb = openpyxl.Workbook(write_only=True)
+
+    ws, current_date, idx = None, None, 0
+    for calculation_date, name, method_used, calculated_reserve in iter_reserve_rows(conn, filters):
+        date_str = _date_str(calculation_date)
+        if date_str != current_date:
+            ws = wb.create_sheet(title=date_str)
+            for column, width in zip('ABCD', widths.get(date_str, [])):
+                ws.column_dimensions[column].width = width
+            ws.append(EXPORT_HEADERS)
+            current_date, idx = date_str, 0
+        idx += 1
+        ws.append([idx, name or '—', method_used, float(calculated_reserve)])
+
+    if ws is None:
+        wb.create_sheet(title='Нет данных').append(EXPORT_HEADERS)
+
+    wb.save(fileobj)
+
+
+def iter_reserves_csv(conn, filters):
+    """Выгрузка в CSV (разделитель «;», UTF-8 с BOM для Excel) порциями строк."""
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    buffer.write('﻿')
+    writer.writerow(['Дата расчёта'] + EXPORT_HEADERS)
+
+    current_date, idx = None, 0
+    for n, (calculation_date, name, method_used, calculated_reserve) in enumerate(
+            iter_reserve_rows(conn, filters), start=1):
+        date_str = _date_str(calculation_date)
+        if date_str != current_date:
+            current_date, idx = date_str, 0
+        idx += 1
+        writer.writerow([date_str, idx, name or '—', method_used, float(calculated_reserve)])
+        if n % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def iter_file_chunks(fileobj, chunk_size=FILE_CHUNK_SIZE):
+    """Чтение файла порциями с закрытием по окончании."""
+    try:
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
@@ -0,0 +1,227 @@
+from datetime import datetime
+from itertools import repeat
+import os
+import time
+import logging
+from utils.log_config import setup_logging
+from utils.jobs import JobCancelled
+from db_connect import db_session
+from utils.reserve_engine import (items_to_frame, validate_items_frame, calculate_reserves_frame,
+                                  input_fingerprints)
+from utils.reserve_queries import fetch_latest_calculations, upsert_reserves, write_reserve_audit
+from utils.inventory_queries import inventory_filters, where_clause
+
+# Настройка логирования
+setup_logging()
+
+# Подробный аудит по каждой позиции в таблицу reserve_audit (включается переменной окружения)
+RESERVE_AUDIT = os.environ.get('RESERVE_AUDIT', '0') == '1'
+
+
+def validate_item(item):
+    """Валидация входных данных для расчета резерва."""
+    required_fields = ["quantity", "price", "shelf_life_months", "received_date"]
+    for field in required_fields:
+        if field not in item or item[field] is None:
+            raise ValueError(f"Поле {field} отсутствует или равно None")
+
+    if item["quantity"] < 0:
+        raise ValueError("Количество не может быть отрицательным")
+    if item["price"] < 0:
+        raise ValueError("Цена не может быть отрицательной")
+    if item["shelf_life_months"] < 0:
+        raise ValueError("Срок хранения не может быть отрицательным")
+    if "usage_probability" in item and item["usage_probability"] is not None and not (
+            0 <= item["usage_probability"] <= 100):
+        raise ValueError("Вероятность использования должна быть в диапазоне [0, 100]")
+
+
+def calculate_reserve(item, override_method=None, prev_reserve=0):
+    """Расчет резерва для одного товара с учетом РСБУ."""
+    try:
+        item = dict(item)
+        validate_item(item)
+
+        qty = item["quantity"]
+        price = item["price"]
+        shelf_life = item["shelf_life_months"]
+        received_date = item["received_date"]
+        usage_prob = item.get("usage_probability", 100)
+        market_price = item.get("market_price", None)
+        method = override_method
+        max_reserve = qty * price
+
+        try:
+            received_dt = datetime.strptime(str(received_date).split()[0], '%Y-%m-%d')
+        except (ValueError, AttributeError):
+            logging.warning("Некорректный формат даты: %s, используется текущая дата", received_date)
+            received_dt = datetime.today()
+
+        today = datetime.today()
+        months = (today.year - received_dt.year) * 12 + (today.month - received_dt.month)
+
+        reserve = 0
+        if method == 'standard':
+            coef_storage = min(1, months / shelf_life) if shelf_life > 0 else 1
+            unused_share = 1 - usage_prob / 100
+            reserve_by_usage = qty * price * coef_storage * unused_share
+            reserve_by_market = max(price - market_price, 0) * qty if market_price is not None else 0
+            reserve = max(reserve_by_usage, reserve_by_market)
+
+        elif method == 'shelf_life':
+            coef_storage = min(1, months / shelf_life) if shelf_life > 0 else 1
+            reserve = qty * price * coef_storage
+            if market_price is not None:
+                reserve = min(reserve, max(price - market_price, 0) * qty)
+
+        elif method == 'market':
+            if market_price is not None and market_price >= 0:
+                reserve = max(price - market_price, 0) * qty
+
+        elif method == 'conservative':
+            if shelf_life and months > shelf_life:
+                reserve = qty * price
+            else:
+                coef = min(1, months / (shelf_life * 1.5)) if shelf_life > 0 else 0
+                reserve = qty * price * coef
+                if market_price is not None:
+                    reserve = max(reserve, max(price - market_price, 0) * qty)
+
+        reserve = min(round(reserve, 2), max_reserve)
+
+        # Логгирование (по позициям — только на уровне DEBUG, форматирование отложенное)
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            name = item.get("name", "unknown")
+            if prev_reserve > reserve:
+                logging.debug("Восстановление резерва для товара %s: %s", name, prev_reserve - reserve)
+            elif prev_reserve < reserve:
+                logging.debug("Начисление резерва для товара %s: %s", name, reserve - prev_reserve)
+            logging.debug("Рассчитан резерв для товара %s: %s (метод: %s)", name, reserve, method)
+
+        return reserve
+
+    except Exception as e:
+        name = item.get("name", "unknown")
+        logging.error("Ошибка при расчете резерва для товара %s: %s", name, e)
+        raise
+
+
+def calculate_reserves(conn, override_method=None, upload_time=None, incremental=False,
+                       chunk_size=None, executor=None, progress=None, audit=None, check_cancelled=None):
+    """Расчет резервов по всем товарам или по документу загрузки upload_time.
+
+    Используется векторизованный расчёт (utils.reserve_engine); calculate_reserve
+    остаётся эталонной построчной реализацией. В инкрементальном режиме позиции,
+    входные данные которых не изменились с прошлого расчёта, пропускаются.
+
+    Если задан chunk_size, позиции считаются порциями (параллельно, если передан
+    executor), и каждая порция записывается и фиксируется отдельно; progress(done, total)
+    вызывается после фиксации каждой порции. check_cancelled() вызывается перед записью
+    порции и может выбросить JobCancelled: текущая порция откатывается, ещё не начатые
+    порции снимаются с executor. В лог пишется одна итоговая запись за расчёт;
+    при audit (по умолчанию RESERVE_AUDIT) изменения по позициям пишутся в reserve_audit.
+    Возвращает {'calculated': ..., 'skipped': ...}.
+    """
+    audit = RESERVE_AUDIT if audit is None else audit
+    started = time.perf_counter()
+    futures = []
+    try:
+        # Получаем товары (простым курсором — строки сразу уходят в DataFrame)
+        conditions, params = inventory_filters(upload_time=upload_time)
+        cur = conn.cursor()
+        cur.execute(f'SELECT * FROM inventory_items {where_clause(conditions)} ORDER BY id', params)
+        items = cur.fetchall()
+        item_columns = [col.name for col in cur.description]
+        today = datetime.today()
+        today_str = today.strftime('%Y-%m-%d')
+
+        if not items:
+            cur.close()
+            conn.commit()
+            return {'calculated': 0, 'skipped': 0}
+
+        df = items_to_frame(items, columns=item_columns)
+        # Проверяем всю выборку до записи первой порции
+        validate_items_frame(df)
+
+        # Предыдущие расчёты тем же методом одним запросом
+        latest = fetch_latest_calculations(conn, override_method,
+                                           None if upload_time is None else df["id"].tolist())
+        fingerprints = input_fingerprints(df, override_method, today)
+
+        skipped = 0
+        if incremental:
+            stored = df["id"].map(lambda item_id: latest.get(item_id, (None, None))[1]).to_numpy()
+            changed = stored != fingerprints
+            skipped = int((~changed).sum())
+            df, fingerprints = df[changed].reset_index(drop=True), fingerprints[changed]
+
+        method_used = override_method
+        step = chunk_size or max(len(df), 1)
+        bounds = [(start, min(start + step, len(df))) for start in range(0, len(df), step)]
+        chunks = [df.iloc[start:end] for start, end in bounds]
+        if executor is not None:
+            futures = [executor.submit(calculate_reserves_frame, chunk, method_used, today) for chunk in chunks]
+            results = (future.result() for future in futures)
+        else:
+            results = map(calculate_reserves_frame, chunks, repeat(method_used), repeat(today))
+
+        accrual = release = 0.0
+        for (start, end), chunk, reserves in zip(bounds, chunks, results):
+            prev = chunk["id"].map(lambda item_id: latest.get(item_id, (0, None))[0]).fillna(0).astype(float).to_numpy()
+            delta = reserves - prev
+            accrual += delta[delta > 0].sum()
+            release -= delta[delta < 0].sum()
+
+            if check_cancelled is not None:
+                check_cancelled()
+            upsert_reserves(cur, [(int(item_id), float(reserve), method_used, today_str, fingerprint)
+                                  for item_id, reserve, fingerprint
+                                  in zip(chunk["id"], reserves, fingerprints[start:end])])
+            if audit:
+                write_reserve_audit(cur, [(int(item_id), float(p), float(reserve), method_used, today_str)
+                                          for item_id, p, reserve in zip(chunk["id"], prev, reserves)])
+            if chunk_size:
+                conn.commit()
+            if progress is not None:
+                progress(end, len(df))
+        cur.close()
+
+        conn.commit()
+        logging.info("Расчет резервов успешно завершен: начисление %.2f, восстановление %.2f "
+                     "(метод: %s, позиций: %d, пропущено: %d)",
+                     accrual, release, method_used, len(df), skipped,
+                     extra={'data': {
+                         'event': 'reserve_run',
+                         'method': method_used,
+                         'upload_time': upload_time,
+                         'calculated': len(df),
+                         'skipped': skipped,
+                         'accrual_total': round(float(accrual), 2),
+                         'release_total': round(float(release), 2),
+                         'duration_s': round(time.perf_counter() - started, 3),
+                     }})
+        return {'calculated': len(df), 'skipped': skipped}
+
+    except JobCancelled:
+        logging.info("Расчет резервов отменен (метод: %s, документ: %s)", override_method, upload_time)
+        conn.rollback()
+        raise
+
+    except Exception as e:
+        logging.error("Ошибка при расчете резервов: %s", e)
+        conn.rollback()
+        raise
+
+    finally:
+        # Порции, расчёт которых ещё не начался, не нужны после отмены или ошибки
+        for future in futures:
+            future.cancel()
+
+
+def calculate_all_reserves(conn=None, override_method=None, incremental=False):
+    """Расчет резервов для всех товаров. Без conn соединение берётся из пула."""
+    if conn is None:
+        with db_session() as conn:
+            return calculate_reserves(conn, override_method, incremental=incremental)
+    return calculate_reserves(conn, override_method, incremental=incremental)
@@ -0,0 +1,141 @@
+from datetime import datetime
+import psycopg2.extras
+from utils.inventory_queries import DEFAULT_PAGE_SIZE, inventory_filters, where_clause
+
+# Запросы к истории резервов, выполняемые одним обращением к БД
+# вместо отдельного SELECT на каждую позицию, и постраничный просмотр истории.
+
+# Ключ сортировки страниц резервов: NULL-дата — 'infinity', т. е. первой при DESC
+NULL_DATE_KEY = 'infinity'
+SORT_DATE_SQL = f"COALESCE(r.calculation_date, DATE '{NULL_DATE_KEY}')"
+
+LATEST_RESERVES_SQL = '''
+    SELECT DISTINCT ON (item_id) item_id, calculated_reserve, input_fingerprint
+    FROM reserve_calculations
+    {where}
+    ORDER BY item_id, calculation_date DESC
+'''
+
+
+def fetch_latest_calculations(conn, method, item_ids=None):
+    """Последний расчёт методом method по каждой позиции:
+    {item_id: (calculated_reserve, input_fingerprint)}.
+
+    Расчёты другими методами не учитываются: upsert_reserves обновляет строку
+    на месте, поэтому ни id, ни порядок записи не говорят, какой метод был последним.
+    За дату хранится не больше одного расчёта методом (уникальный ключ
+    item_id, calculation_date, method_used), так что выбор однозначен.
+    Если item_ids не передан, возвращаются расчёты по всем позициям.
+    Опирается на индекс reserve_calculations(item_id, method_used, calculation_date DESC).
+    """
+    if item_ids is not None and len(item_ids) == 0:
+        return {}
+
+    conditions, params = ['method_used IS NULL'], []
+    if method is not None:
+        conditions, params = ['method_used = %s'], [method]
+    if item_ids is not None:
+        conditions.append('item_id = ANY(%s)')
+        params.append([int(item_id) for item_id in item_ids])
+
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cur.execute(LATEST_RESERVES_SQL.format(where=where_clause(conditions)), params)
+        return {row['item_id']: (row['calculated_reserve'], row['input_fingerprint'])
+                for row in cur.fetchall()}
+    finally:
+        cur.close()
+
+
+def upsert_reserves(cur, rows, page_size=1000):
+    """Идемпотентная запись расчётов: повторный расчёт за ту же дату тем же методом
+    обновляет строку, а не добавляет новую.
+
+    rows — [(item_id, calculated_reserve, method_used, calculation_date, input_fingerprint)].
+    """
+    psycopg2.extras.execute_values(cur, '''
+        INSERT INTO reserve_calculations (item_id, calculated_reserve, method_used, calculation_date, input_fingerprint)
+        VALUES %s
+        ON CONFLICT (item_id, calculation_date, method_used) DO UPDATE
+        SET calculated_reserve = EXCLUDED.calculated_reserve,
+            input_fingerprint = EXCLUDED.input_fingerprint
+    ''', rows, page_size=page_size)
+
+
+def reserve_filters(upload_time=None, category=None, calculation_date=None):
+    """Условия WHERE для выборки резервов (r — reserve_calculations, i — inventory_items)."""
+    conditions, params = inventory_filters(upload_time, category, alias='i')
+    if calculation_date:
+        conditions.append('r.calculation_date = %s')
+        params.append(datetime.strptime(calculation_date, '%Y-%m-%d').date())
+    return conditions, params
+
+
+def fetch_reserve_date_groups(conn, upload_time=None, category=None, calculation_date=None):
+    """Даты расчёта с числом записей одним GROUP BY: [(calculation_date, count)]."""
+    conditions, params = reserve_filters(upload_time, category, calculation_date)
+    cur = conn.cursor()
+    try:
+        cur.execute(f'''
+            SELECT r.calculation_date, COUNT(*)
+            FROM reserve_calculations r
+            JOIN inventory_items i ON r.item_id = i.id
+            {where_clause(conditions)}
+            GROUP BY r.calculation_date
+            ORDER BY r.calculation_date DESC
+        ''', params)
+        return [
+            (calculation_date.strftime('%Y-%m-%d') if calculation_date else '—', count)
+            for calculation_date, count in cur.fetchall()
+        ]
+    finally:
+        cur.close()
+
+
+def fetch_reserves_page(conn, upload_time=None, category=None, calculation_date=None,
+                        after=None, limit=DEFAULT_PAGE_SIZE):
+    """Страница резервов в порядке (дата расчёта DESC, наименование, id).
+
+    after — ключ последней строки предыдущей страницы (calculation_date, name, id).
+    Расчёты без даты идут первыми, как NULL в ORDER BY ... DESC у fetch_reserve_date_groups;
+    в ключе их дата — NULL_DATE_KEY.
+    Возвращает (строки, ключ для следующей страницы или None).
+    """
+    conditions, params = reserve_filters(upload_time, category, calculation_date)
+    if after is not None:
+        after_date, after_name, after_id = after
+        conditions.append(f'''({SORT_DATE_SQL} < %s OR ({SORT_DATE_SQL} = %s
+            AND (COALESCE(i.name, ''), r.id) > (%s, %s)))''')
+        params.extend([after_date, after_date, after_name, after_id])
+
+    cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+    try:
+        cur.execute(f'''
+            SELECT r.id, r.item_id, i.name, r.calculated_reserve, r.method_used, r.calculation_date
+            FROM reserve_calculations r
+            JOIN inventory_items i ON r.item_id = i.id
+            {where_clause(conditions)}
+            ORDER BY {SORT_DATE_SQL} DESC, COALESCE(i.name, ''), r.id
+            LIMIT %s
+        ''', params + [limit + 1])
+        rows = cur.fetchall()
+    finally:
+        cur.close()
+
+    next_after = None
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        last_date = last['calculation_date']
+        next_after = (last_date.strftime('%Y-%m-%d') if last_date else NULL_DATE_KEY, last['name'] or '', last['id'])
+    return rows[:limit], next_after
+
+
+def write_reserve_audit(cur, rows, page_size=1000):
+    """Пакетная запись аудита расчёта по позициям.
+
+    rows — [(item_id, prev_reserve, calculated_reserve, method_used, calculation_date)].
+    """
+    psycopg2.extras.execute_values(cur, '''
+        INSERT INTO reserve_audit (item_id, prev_reserve, calculated_reserve, method_used, calculation_date)
+        VALUES %s
+    ''', rows, page_size=page_size)
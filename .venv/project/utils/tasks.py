@@ -0,0 +1,42 @@
+import os
+from io import BytesIO
+from db_connect import db_session
+from utils.jobs import get_cpu_pool
+from utils.reserve_logic import calculate_reserves
+from utils.ingest import REQUIRED_COLUMNS, normalize_columns, read_upload_frame, ingest_inventory
+
+# Фоновые задачи приложения: функции вида fn(job, ...) для JobManager.submit.
+
+CALCULATION_CHUNK_SIZE = int(os.environ.get('JOBS_CHUNK_SIZE', 20000))
+MAX_JOB_ERRORS_REPORTED = 100
+
+
+def calculate_reserves_job(job, method, upload_time=None, incremental=False):
+    """Расчёт резервов порциями: порции считаются параллельно в пуле процессов,
+    результаты записываются и фиксируются по мере готовности. Отмена проверяется
+    перед записью каждой порции; уже зафиксированные порции остаются в БД."""
+    with db_session() as conn:
+        return calculate_reserves(conn, override_method=method, upload_time=upload_time,
+                                  incremental=incremental, chunk_size=CALCULATION_CHUNK_SIZE,
+                                  executor=get_cpu_pool(), progress=job.update_progress,
+                                  check_cancelled=job.check_cancelled)
+
+
+def ingest_file_job(job, filename, content):
+    """Разбор загруженного файла и запись МПЗ одной транзакцией."""
+    job.set_progress(0, 2)
+    df = normalize_columns(read_upload_frame(filename, BytesIO(content)))
+    if not all(col in df.columns for col in REQUIRED_COLUMNS):
+        raise ValueError('файл должен содержать столбцы: name, quantity, price')
+
+    job.set_progress(1, 2)
+    with db_session() as conn:
+        inserted, row_errors = ingest_inventory(conn, df)
+    # Данные уже зафиксированы — отмена после COPY не проверяется
+    job.update_progress(2)
+    return {
+        'inserted': inserted,
+        'rows': len(df),
+        'error_count': len(row_errors),
+        'errors': [{'row': row, 'message': message} for row, message in row_errors[:MAX_JOB_ERRORS_REPORTED]],
+    }